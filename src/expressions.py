@@ -1,76 +1,285 @@
 from __future__ import annotations
 
-import abc
+import enum
 import math
-from copy import deepcopy
+from copy import copy
+from operator import attrgetter, eq, ge, gt, is_, le, lt, ne
 from typing import (
     Any,
     Callable,
     ClassVar,
+    Iterable,
     Self,
+    Sequence,
     TypeVar,
     cast,
     get_type_hints,
     override,
 )
-from uuid import UUID, uuid4
+from uuid import UUID
+from weakref import WeakValueDictionary
 
-from sqlalchemy import Engine, insert
-from sqlalchemy.orm import Session
+from sqlalchemy import Engine, Table, insert
+from sqlalchemy.dialects import postgresql
 
-from schema import EvaluatedExpressionRecord, define_arbitrary_metadata_table
-from utils import get_exactly_one
+from schema import (
+    EvaluatedExpressionRecord,
+    association_table,
+    define_arbitrary_metadata_table,
+)
+from utils import get_exactly_one, uuid7, uuid7s
 
 # ======================================================================================
 # Base expressions
 
 
-class BaseExpression[T](abc.ABC):
-    _id: UUID
+class _Missing(enum.Enum):
+    MISSING = enum.auto()
+
+
+# Sentinel for not-yet-computed cached properties, since `None` is a valid value:
+_MISSING = _Missing.MISSING
+
+_value_of = attrgetter("value")
+_evaluated_expression_of = attrgetter("evaluated_expression")
+_is_pure_of = attrgetter("_is_pure")
+
+# Reasons written so far, with sub-expressions whose reasons are yet to be written:
+type _ReasonParts = list[str | BaseExpression[Any]]
+
+
+class BaseExpression[T]:
+    __slots__ = (
+        "__weakref__",
+        "_cached_evaluated_expression",
+        "_cached_program",
+        "_cached_reason",
+        "_cached_value",
+        "_is_pure",
+        "_lazy_id",
+        "_name",
+    )
+    _lazy_id: UUID | None
     _name: str | None
+    # Whether no callables are evaluated, so that the value can never change:
+    _is_pure: bool
+    _cached_value: T | _Missing
+    _cached_evaluated_expression: BaseExpression[T] | _Missing
+    _cached_program: _Program | _Missing
+    _cached_reason: str | _Missing
     _operator: ClassVar[str | None]
     _short_operator: ClassVar[str | None]
+    _separator: ClassVar[str]
+    # Whether structurally identical expressions can be shared:
+    _is_internable: ClassVar[bool] = False
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "_short_operator" in cls.__dict__:
+            cls._separator = f" {cls._short_operator} "
 
     def __init__(self) -> None:
-        self._id = uuid4()
+        self._lazy_id = None
         self._name = None
+        self._is_pure = True
+        self._cached_value = _MISSING
+        self._cached_evaluated_expression = _MISSING
+        self._cached_program = _MISSING
+        self._cached_reason = _MISSING
+
+    @property
+    def _id(self) -> UUID:
+        if self._lazy_id is None:
+            self._lazy_id = uuid7()
+        return self._lazy_id
 
     @property
-    @abc.abstractmethod
-    def operands(self) -> list[BaseExpression[Any]]:
+    def operands(self) -> tuple[BaseExpression[Any], ...]:
         raise NotImplementedError
 
     @property
-    @abc.abstractmethod
     def value(self) -> T:
+        if self._cached_value is _MISSING:
+            self._cached_value = self._compute_value()
+        return self._cached_value
+
+    def _compute_value(self) -> T:
         raise NotImplementedError
 
     @property
-    @abc.abstractmethod
     def evaluated_expression(self) -> BaseExpression[T]:
+        if self._cached_evaluated_expression is _MISSING:
+            self._cached_evaluated_expression = self._compute_evaluated_expression()
+        return self._cached_evaluated_expression
+
+    def _compute_evaluated_expression(self) -> BaseExpression[T]:
         raise NotImplementedError
 
+    def compile(self) -> Callable[..., T]:
+        """Return a function that evaluates this expression afresh on each call.
+
+        The expression is compiled once into a linear program, which is then
+        interpreted without walking the expression. Unlike `value`, which is computed
+        once, callable literals are called again on each evaluation, and the values of
+        named literals can be overridden by passing them as keyword arguments, e.g.
+        `Numeric(a=1).times(b=2).compile()(a=3)`. Names that no named literal has raise
+        a `KeyError`, unless callable literals are compiled, as these can return
+        expressions with named literals of their own.
+        """
+        code, memo_size = self._program
+        if any(opcode == _CALL for opcode, _ in code):
+            return lambda **inputs: _run(code, memo_size, inputs)
+        input_names = frozenset(
+            argument[0] for opcode, argument in code if opcode == _INPUT
+        )
+
+        def evaluate(**inputs: Any) -> T:
+            if not input_names.issuperset(inputs):
+                unknown_names = ", ".join(sorted(inputs.keys() - input_names))
+                raise KeyError(f"There are no named literals named {unknown_names}.")
+            return _run(code, memo_size, inputs)
+
+        return evaluate
+
+    @property
+    def _program(self) -> _Program:
+        if self._cached_program is _MISSING:
+            self._cached_program = self._compile_program()
+        return self._cached_program
+
+    def _compile_program(self) -> _Program:
+        occurrences: dict[int, int] = {}
+        self._count_occurrences(occurrences)
+        memo_slots: dict[int, int] = {}
+        for expression_id, count in occurrences.items():
+            if count > 1:
+                memo_slots[expression_id] = len(memo_slots)
+        code: _Code = []
+        self._emit(code, memo_slots)
+        return tuple(code), len(memo_slots)
+
+    def _count_occurrences(self, occurrences: dict[int, int]) -> None:
+        if id(self) in occurrences:
+            occurrences[id(self)] += 1
+        else:
+            occurrences[id(self)] = 1
+            for o in self._evaluated_operands:
+                o._count_occurrences(occurrences)
+
+    @property
+    def _evaluated_operands(self) -> tuple[BaseExpression[Any], ...]:
+        """The sub-expressions that computing `value` may evaluate."""
+        return self.operands
+
+    def _emit(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        memo_slot = memo_slots.get(id(self))
+        if memo_slot is None:
+            self._emit_evaluation(code, memo_slots)
+        else:
+            load_index = len(code)
+            code.append((_LOAD_OR_JUMP, None))  # Target patched below.
+            self._emit_evaluation(code, memo_slots)
+            code.append((_STORE, memo_slot))
+            code[load_index] = (_LOAD_OR_JUMP, (memo_slot, len(code)))
+
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        """Append instructions that push the value of this expression."""
+        raise NotImplementedError
+
+    def _emit_application(
+        self,
+        code: _Code,
+        memo_slots: dict[int, int],
+        function: Callable[..., Any],
+        operands: tuple[BaseExpression[Any], ...],
+    ) -> None:
+        for o in operands:
+            o._emit(code, memo_slots)
+        code.append((_APPLY, (function, len(operands))))
+
     @property
     def reason(self) -> str:
-        return f" {self._short_operator} ".join(f"({o.reason})" for o in self.operands)
+        if self._cached_reason is _MISSING:
+            # Operands are written from a stack rather than recursively, although
+            # values and evaluated expressions (e.g. of false `And`s) still recurse:
+            parts: list[str] = []
+            pending: _ReasonParts = [self]
+            while pending:
+                part = pending.pop()
+                if isinstance(part, str):
+                    parts.append(part)
+                elif part._cached_reason is not _MISSING:
+                    parts.append(part._cached_reason)
+                else:
+                    written: _ReasonParts = []
+                    part._write_reason(written)
+                    pending.extend(reversed(written))
+            self._cached_reason = "".join(parts)
+        return self._cached_reason
+
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        self._write_reasons_of(self.operands, parts)
+
+    def _write_reasons_of(
+        self, operands: Iterable[BaseExpression[Any]], parts: _ReasonParts
+    ) -> None:
+        separator = self._separator
+        for i, o in enumerate(operands):
+            if i > 0:
+                parts.append(separator)
+            parts.append("(")
+            parts.append(o)
+            parts.append(")")
 
     def __str__(self) -> str:
-        return (
-            (f"{self._name} := " if self._name else "")
-            + f"{self.value} because "
-            + self.reason
-        )
+        parts: list[str] = []
+        if self._name:
+            parts.append(f"{self._name} := ")
+        parts.append(f"{self.value} because ")
+        self._write_str_reason(parts)
+        return "".join(parts)
+
+    def _write_str_reason(self, parts: list[str]) -> None:
+        parts.append(self.reason)
 
     @property
     def evaluated_expression_record(self) -> EvaluatedExpressionRecord:
-        return EvaluatedExpressionRecord(
-            id=self._id,
-            name=self._name,
-            value=self.value,
-            operator=self._operator,
-            children=[o.evaluated_expression_record for o in self.operands],
+        records: dict[int, EvaluatedExpressionRecord] = {}
+        for expression in self._unique_expressions_bottom_up():
+            records[id(expression)] = expression._record(
+                children=[records[i] for i in map(id, expression.operands)]
+            )
+        return records[id(self)]
+
+    def _record(
+        self, children: list[EvaluatedExpressionRecord]
+    ) -> EvaluatedExpressionRecord:
+        return EvaluatedExpressionRecord(**self._record_row(), children=children)
+
+    def _record_row(self) -> dict[str, Any]:
+        return dict(
+            id=self._id, name=self._name, value=self.value, operator=self._operator
         )
 
+    def _unique_expressions_bottom_up(self) -> list[BaseExpression[Any]]:
+        """Return this expression and its descendants, each after its operands.
+
+        Iterative rather than recursive, so that deep expressions do not hit the
+        recursion limit.
+        """
+        expressions: list[BaseExpression[Any]] = []
+        visited: set[int] = set()
+        stack: list[tuple[BaseExpression[Any], bool]] = [(self, False)]
+        while stack:
+            expression, operands_done = stack.pop()
+            if operands_done:
+                expressions.append(expression)
+            elif id(expression) not in visited:
+                visited.add(id(expression))
+                stack.append((expression, True))
+                stack.extend((o, False) for o in expression.operands)
+        return expressions
+
     def to_db(self, db_engine: Engine, metadata: dict[str, Any]) -> None:
         if self._name is None:
             raise ValueError(
@@ -80,21 +289,66 @@ class BaseExpression[T](abc.ABC):
 
         metadata_table = define_arbitrary_metadata_table(metadata.keys())
 
-        with Session(db_engine) as session:
-            session.merge(self.evaluated_expression_record)  # Also adds children.
-            session.commit()
-            session.execute(
+        expressions = self._unique_expressions_bottom_up()
+        _generate_ids(expressions)
+        expression_rows = [e._record_row() for e in expressions]
+        expression_rows.reverse()
+        association_rows = [
+            dict(parent_id=parent_id, child_id=child_id)
+            for parent_id, child_id in dict.fromkeys(
+                (e._id, o._id) for e in reversed(expressions) for o in e.operands
+            )
+        ]
+
+        # Sub-expressions shared with earlier insertions are already in the database:
+        expression_table = cast(Table, EvaluatedExpressionRecord.__table__)
+        with db_engine.begin() as connection:
+            connection.execute(
+                postgresql.insert(expression_table).on_conflict_do_nothing(),
+                expression_rows,
+            )
+            if association_rows:
+                connection.execute(
+                    postgresql.insert(association_table).on_conflict_do_nothing(),
+                    association_rows,
+                )
+            connection.execute(
                 insert(metadata_table).values(
                     evaluated_expression_id=self._id, **metadata
                 )
             )
-            session.commit()
 
     def with_name(self, name: str) -> Self:
-        self = deepcopy(self)
+        self = copy(self)
+        self._lazy_id = None
         self._name = name
+        self._cached_evaluated_expression = _MISSING
+        self._cached_reason = _MISSING
+        self._cached_program = _MISSING
         return self
 
+    def invalidate(self) -> None:
+        """Forget the cached results of this expression and its sub-expressions.
+
+        For when callable literals would now return something else, e.g. because what
+        they read has changed. IDs are forgotten as well, so that the results are
+        inserted into the database afresh. Expressions that evaluate no callables are
+        left as they are, as their results cannot change and they may be shared with
+        other expressions. Other expressions that share callable literals with this one
+        need to be invalidated too.
+        """
+        visited: set[int] = set()
+        stack: list[BaseExpression[Any]] = [self]
+        while stack:
+            expression = stack.pop()
+            if not expression._is_pure and id(expression) not in visited:
+                visited.add(id(expression))
+                expression._cached_value = _MISSING
+                expression._cached_evaluated_expression = _MISSING
+                expression._cached_reason = _MISSING
+                expression._lazy_id = None
+                stack.extend(expression._evaluated_operands)
+
     def if_(
         self,
         *unnamed_expressions: BaseExpression[bool],
@@ -104,6 +358,8 @@ class BaseExpression[T](abc.ABC):
         return TwoThirdsTernary(result_if_true=self, condition=condition)
 
     def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
         if isinstance(other, BaseExpression):
             other = cast(BaseExpression[T], other)
             return (
@@ -131,6 +387,7 @@ type LiteralOrExprOrCallableThereof[T] = (
 
 
 class BaseLiteralExpression[T](BaseExpression[T]):
+    __slots__ = ("_literal_value",)
     _literal_value: LiteralOrExprOrCallableThereof[T]
     _operator: ClassVar[str | None] = None
     _short_operator: ClassVar[str | None] = _operator
@@ -141,7 +398,11 @@ class BaseLiteralExpression[T](BaseExpression[T]):
         **named_values: LiteralOrExprOrCallableThereof[T],
     ) -> None:
         super().__init__()
-        if len(unnamed_values) > 0:
+        if len(unnamed_values) == 1 and not named_values:
+            (self._literal_value,) = unnamed_values
+        elif len(named_values) == 1 and not unnamed_values:
+            ((self._name, self._literal_value),) = named_values.items()
+        elif len(unnamed_values) > 0:
             if len(named_values) > 0:
                 raise ValueError(
                     "Either `unnamed_values` or `named_values` must contain a value, "
@@ -151,25 +412,66 @@ class BaseLiteralExpression[T](BaseExpression[T]):
         else:
             self._literal_value = get_exactly_one(named_values.values())
             self._name = get_exactly_one(named_values.keys())
+        self._is_pure = not callable(self._literal_value) and (
+            not isinstance(self._literal_value, BaseExpression)
+            or self._literal_value._is_pure
+        )
 
-    @property
-    def value(self) -> T:
+    def _compute_value(self) -> T:
         return_value = (
             self._literal_value()
             if callable(self._literal_value)
             else self._literal_value
         )
+        if type(return_value) in _PRIMITIVE_TYPES:
+            return return_value  # type: ignore
         if isinstance(return_value, BaseExpression):
-            return cast(BaseExpression[T], return_value).value
-        else:
-            return cast(T, return_value)
+            return return_value.value  # type: ignore
+        return return_value  # type: ignore
 
     @property
-    def operands(self) -> list[BaseExpression[T]]:
-        return []
+    def operands(self) -> tuple[BaseExpression[T], ...]:
+        return ()
 
     @property
-    def evaluated_expression(self) -> BaseExpression[T]:
+    @override
+    def _evaluated_operands(self) -> tuple[BaseExpression[Any], ...]:
+        if isinstance(self._literal_value, BaseExpression):
+            return (cast(BaseExpression[T], self._literal_value),)
+        elif isinstance(self._literal_value, _NotNull):
+            return (self._literal_value.nullable,)
+        else:
+            return ()
+
+    @override
+    def _emit(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        input_index = None
+        if self._name is not None:
+            input_index = len(code)
+            code.append((_INPUT, None))  # Target patched below.
+        if callable(self._literal_value) or isinstance(
+            self._literal_value, BaseExpression
+        ):
+            super()._emit(code, memo_slots)
+        else:
+            code.append((_CONST, self._literal_value))
+        if input_index is not None:
+            code[input_index] = (_INPUT, (self._name, len(code)))
+
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        if isinstance(self._literal_value, BaseExpression):
+            cast(BaseExpression[T], self._literal_value)._emit(code, memo_slots)
+        elif isinstance(self._literal_value, _NotNull):
+            self._literal_value.nullable._emit(code, memo_slots)
+            code.append((_APPLY, (_not_none, 1)))
+        elif callable(self._literal_value):
+            code.append((_CALL, self._literal_value))
+        else:
+            code.append((_CONST, self._literal_value))
+
+    def _compute_evaluated_expression(self) -> BaseExpression[T]:
+        if isinstance(self._literal_value, _NotNull):
+            return self._literal_value().evaluated_expression
         return_type = (
             get_type_hints(
                 self._literal_value, localns=dict(T=T, BaseExpression=BaseExpression)
@@ -189,10 +491,11 @@ class BaseLiteralExpression[T](BaseExpression[T]):
         else:
             return self
 
-    @property
     @override
-    def reason(self) -> str:
-        return (f"{self._name} := " if self._name else "") + f"{self.value}"
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        if self._name:
+            parts.append(f"{self._name} := ")
+        parts.append(f"{self.value}")
 
     @override
     def __str__(self) -> str:
@@ -200,22 +503,47 @@ class BaseLiteralExpression[T](BaseExpression[T]):
 
     @classmethod
     def from_(cls, nullable: BaseExpression[Any | None]) -> Self:
-        def not_null() -> BaseExpression[T]:
-            if nullable.value is None:
-                raise ValueError
-            return cast(BaseExpression[T], nullable)
+        return cls(_NotNull(nullable))
+
+
+class _NotNull:
+    """The value of a literal made by `from_()`, which raises if `nullable` is null.
+
+    Kept as an object, rather than a closure, so that `nullable` can be evaluated and
+    compiled as a sub-expression.
+    """
+
+    __slots__ = ("nullable",)
+
+    def __init__(self, nullable: BaseExpression[Any | None]) -> None:
+        self.nullable = nullable
 
-        return cls(not_null)
+    def __call__(self) -> BaseExpression[Any]:
+        if self.nullable.value is None:
+            raise ValueError
+        return self.nullable
 
 
 class Nullable[T](BaseLiteralExpression[T | None]):
-    pass
+    __slots__ = ()
+
+
+def _generate_ids(expressions: list[BaseExpression[Any]]) -> None:
+    """Generate the IDs that `expressions` do not have yet, in one batch.
+
+    Equivalent to calling `uuid7()` for each, but with a single `os.urandom()` call.
+    """
+    unidentified = [e for e in expressions if e._lazy_id is None]
+    for e, id_ in zip(unidentified, uuid7s(len(unidentified)), strict=True):
+        e._lazy_id = id_
 
 
 def _one_expression_from[T](
     unnamed_expressions: tuple[BaseExpression[T] | T, ...],
     named_expressions: dict[str, BaseExpression[T] | T],
 ) -> BaseExpression[T]:
+    if len(unnamed_expressions) == 1 and not named_expressions:
+        return _interned(_ensure_expression(unnamed_expressions[0]))
     return get_exactly_one(_expressions_from(unnamed_expressions, named_expressions))
 
 
@@ -224,49 +552,98 @@ def _expressions_from[T](
     named_expressions: dict[str, BaseExpression[T] | T],
 ) -> list[BaseExpression[T]]:
     expressions: list[BaseExpression[T]] = [
-        _ensure_expression(e) for e in unnamed_expressions
-    ] + [_ensure_expression(e).with_name(n) for n, e in named_expressions.items()]
+        _interned(_ensure_expression(e)) for e in unnamed_expressions
+    ]
+    for n, e in named_expressions.items():
+        expressions.append(
+            _interned(
+                e.with_name(n)
+                if isinstance(e, BaseExpression)
+                else BaseLiteralExpression[T](**{n: e})
+            )
+        )
     if len(expressions) == 0:
         raise Exception
     return expressions
 
 
+# Weakly referenced, so that unused expressions are not kept alive:
+_interned_expressions: WeakValueDictionary[tuple[Any, ...], BaseExpression[Any]] = (
+    WeakValueDictionary()
+)
+
+
+def _interned[T](expression: BaseExpression[T]) -> BaseExpression[T]:
+    # Expressions whose values can change are not shared, as they can be invalidated:
+    if not (expression._is_internable and expression._is_pure):
+        return expression
+    # The operands are kept alive by the interned expression, so their IDs are not
+    # reused while it is in the table:
+    key = (type(expression), expression._name, *map(id, expression.operands))
+    return _interned_expressions.setdefault(key, expression)
+
+
+def _flattened[T](
+    associative_type: type[And | Or | Product | Sum],
+    expressions: Iterable[BaseExpression[T]],
+) -> tuple[BaseExpression[T], ...]:
+    """Splice in the operands of any unnamed expressions of `associative_type`."""
+    operands: list[BaseExpression[T]] = []
+    append = operands.append
+    extend = operands.extend
+    for e in expressions:
+        # Named ones are kept as-is, so that their names are not lost:
+        if type(e) is associative_type and e._name is None:
+            extend(e._operands)  # type: ignore
+        else:
+            append(e)
+    return tuple(operands)
+
+
 # ======================================================================================
 # Boolean expressions
 
 
 class BooleanBaseExpression(BaseExpression[bool]):
-    @property
+    __slots__ = ()
+
     @override
-    def reason(self) -> str:
-        return (
-            f" {self._short_operator} ".join(f"({o.reason})" for o in self.operands)
-            if self.value
-            else self.evaluated_expression.reason
-        )
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        if self.value:
+            self._write_reasons_of(self.operands, parts)
+        else:
+            parts.append(self.evaluated_expression.reason)
 
     def and_(
         self,
         *unnamed_expressions: BaseExpression[bool],
         **named_expressions: BaseExpression[bool] | bool,
     ) -> And:
-        return And(self, *_expressions_from(unnamed_expressions, named_expressions))
+        expressions = _expressions_from(unnamed_expressions, named_expressions)
+        if type(self) is And and self._name is None:
+            return self._extended(_flattened(And, expressions))  # type: ignore
+        return And(self, *expressions)
 
     def or_(
         self,
         *unnamed_expressions: BaseExpression[bool],
         **named_expressions: BaseExpression[bool] | bool,
     ) -> Or:
-        return Or(
-            self, _one_boolean_expression_from(unnamed_expressions, named_expressions)
+        expression = _one_boolean_expression_from(
+            unnamed_expressions, named_expressions
         )
+        if type(self) is Or and self._name is None:
+            return self._extended(_flattened(Or, [expression]))  # type: ignore
+        return Or(self, expression)
 
 
 class BooleanLiteralExpression(BaseLiteralExpression[bool], BooleanBaseExpression):
-    pass
+    __slots__ = ()
 
 
 class Not(BooleanBaseExpression):
+    __slots__ = ("_operand",)
+    _is_internable: ClassVar[bool] = True
     _operator: ClassVar[str | None] = "not"
     _short_operator: ClassVar[str | None] = _operator
     _operand: BaseExpression[bool]
@@ -280,32 +657,35 @@ class Not(BooleanBaseExpression):
         self._operand = _one_boolean_expression_from(
             unnamed_expressions, named_expressions
         )
+        self._is_pure = self._operand._is_pure
 
     @property
-    def operands(self) -> list[BaseExpression[bool]]:
-        return [self._operand]
+    def operands(self) -> tuple[BaseExpression[bool], ...]:
+        return (self._operand,)
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return not self._operand.value
 
-    @property
-    def evaluated_expression(self) -> BaseExpression[bool]:
-        return (
-            Not(self._operand.evaluated_expression)
-            if self.value
-            else self._operand.evaluated_expression
-        )
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, _not, (self._operand,))
 
-    @property
-    def reason(self) -> str:
-        return self._operand.reason
+    def _compute_evaluated_expression(self) -> BaseExpression[bool]:
+        if not self.value:
+            return self._operand.evaluated_expression
+        evaluated_operand = self._operand.evaluated_expression
+        if _is_unchanged(self, (evaluated_operand,)):
+            return self
+        return Not(evaluated_operand)
 
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        parts.append(self._operand)
 
-class And(BooleanBaseExpression):
-    _operator: ClassVar[str | None] = "and"
-    _short_operator: ClassVar[str | None] = _operator
-    _operands: list[BaseExpression[bool]]
+
+class _ShortCircuitingExpression(BooleanBaseExpression):
+    __slots__ = ("_operands",)
+    _is_internable: ClassVar[bool] = True
+    _operands: tuple[BaseExpression[bool], ...]
 
     def __init__(
         self,
@@ -313,73 +693,93 @@ class And(BooleanBaseExpression):
         **named_expressions: BaseExpression[bool] | bool,
     ) -> None:
         super().__init__()
-        self._operands = []
-        for o in _expressions_from(unnamed_expressions, named_expressions):
-            if o._name is not None or not isinstance(o, And):
-                self._operands.append(o)
-            else:
-                self._operands.extend(o._operands)
+        self._operands = _flattened(
+            type(self), _expressions_from(unnamed_expressions, named_expressions)
+        )
+        self._is_pure = all(map(_is_pure_of, self._operands))
+
+    def _extended(self, operands: tuple[BaseExpression[bool], ...]) -> Self:
+        """Return an unnamed copy with flattened `operands` appended.
+
+        Only the appended operands are visited, rather than flattening all of them
+        again, so that each `and_()`/`or_()` call in a chain only copies the operands
+        so far.
+        """
+        extended = copy(self)
+        BooleanBaseExpression.__init__(extended)
+        extended._operands = self._operands + operands
+        extended._is_pure = self._is_pure and all(map(_is_pure_of, operands))
+        return extended
 
     @property
-    def operands(self) -> list[BaseExpression[bool]]:
+    def operands(self) -> tuple[BaseExpression[bool], ...]:
         return self._operands
 
-    @property
-    def value(self) -> bool:
-        return all(o.value for o in self._operands)
 
-    @property
-    def evaluated_expression(self) -> BaseExpression[bool]:
-        return (
-            And(*[o.evaluated_expression for o in self._operands])
-            if self.value
-            else Or(
+class And(_ShortCircuitingExpression):
+    __slots__ = ()
+    _operator: ClassVar[str | None] = "and"
+    _short_operator: ClassVar[str | None] = _operator
+
+    def _compute_value(self) -> bool:
+        return all(map(_value_of, self._operands))
+
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        _emit_short_circuit(code, memo_slots, _JUMP_IF_FALSE, self._operands)
+
+    def _compute_evaluated_expression(self) -> BaseExpression[bool]:
+        if not self.value:
+            # Also evaluates the operands that short-circuiting `value` skipped:
+            return Or(
                 *[Not(o) for o in self._operands if not o.value]
             ).evaluated_expression
-        )
+        evaluated_operands = list(map(_evaluated_expression_of, self._operands))
+        if _is_unchanged(self, evaluated_operands):
+            return self
+        return And(*evaluated_operands)
 
 
-class Or(BooleanBaseExpression):
+class Or(_ShortCircuitingExpression):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "or"
     _short_operator: ClassVar[str | None] = _operator
-    _operands: list[BaseExpression[bool]]
 
-    def __init__(
-        self,
-        *unnamed_expressions: BaseExpression[bool] | bool,
-        **named_expressions: BaseExpression[bool] | bool,
-    ) -> None:
-        super().__init__()
-        self._operands = []
-        for o in _expressions_from(unnamed_expressions, named_expressions):
-            if o._name is not None or not isinstance(o, Or):
-                self._operands.append(o)
-            else:
-                self._operands.extend(o._operands)
+    def _compute_value(self) -> bool:
+        return any(map(_value_of, self._operands))
 
-    @property
-    def operands(self) -> list[BaseExpression[bool]]:
-        return self._operands
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        _emit_short_circuit(code, memo_slots, _JUMP_IF_TRUE, self._operands)
 
-    @property
-    def value(self) -> bool:
-        return any(o.value for o in self._operands)
+    def _compute_evaluated_expression(self) -> BaseExpression[bool]:
+        if not self.value:
+            return And(*[Not(o) for o in self._operands]).evaluated_expression
+        # Also evaluates the operands that short-circuiting `value` skipped:
+        evaluated_operands = [o.evaluated_expression for o in self._operands if o.value]
+        if _is_unchanged(self, evaluated_operands):
+            return self
+        return Or(*evaluated_operands)
 
-    @property
-    def evaluated_expression(self) -> BaseExpression[bool]:
-        return (
-            Or(*[o.evaluated_expression for o in self._operands if o.value])
-            if self.value
-            else And(*[Not(o) for o in self._operands]).evaluated_expression
-        )
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        if self.value:
+            self._write_reasons_of((o for o in self._operands if o.value), parts)
+        else:
+            parts.append(self.evaluated_expression.reason)
 
-    @property
-    def reason(self) -> str:
-        return (
-            " or ".join(f"({o.reason})" for o in self._operands if o.value)
-            if self.value
-            else self.evaluated_expression.reason
-        )
+
+def _is_unchanged(
+    expression: BaseExpression[bool], evaluated_operands: Sequence[BaseExpression[bool]]
+) -> bool:
+    """Whether `expression` can be its own evaluated expression.
+
+    Only if unnamed, as rebuilt evaluated expressions are, so that it is flattened into
+    its parents the same way.
+    """
+    return (
+        expression._name is None
+        and len(evaluated_operands) == len(expression.operands)
+        and all(map(is_, evaluated_operands, expression.operands))
+    )
 
 
 def _one_boolean_expression_from(
@@ -387,6 +787,8 @@ def _one_boolean_expression_from(
     named_expressions: dict[str, BaseExpression[bool] | bool],
     allow_multiple_input: bool = True,
 ) -> BaseExpression[bool]:
+    if len(unnamed_expressions) == 1 and not named_expressions:
+        return _interned(_ensure_expression(unnamed_expressions[0]))
     expressions = _expressions_from(unnamed_expressions, named_expressions)
     if len(expressions) > 1 and not allow_multiple_input:
         raise Exception
@@ -397,11 +799,22 @@ def _one_boolean_expression_from(
 
 
 def _ensure_expression[T](input: BaseExpression[T] | T) -> BaseExpression[T]:
-    return (
-        cast(BaseExpression[T], input)
-        if isinstance(input, BaseExpression)
-        else BaseLiteralExpression[T](input)
-    )
+    if type(input) in _PRIMITIVE_TYPES:
+        pooled = _literal_pool.get((type(input), input))
+        if pooled is not None:
+            return pooled
+    elif isinstance(input, BaseExpression):
+        return input  # type: ignore
+    return BaseLiteralExpression[T](input)
+
+
+_PRIMITIVE_TYPES = frozenset((bool, int, float, str, type(None)))
+
+
+# Keyed by type too, since e.g. `1 == True`:
+_literal_pool: dict[tuple[type, Any], BaseLiteralExpression[Any]] = {
+    (type(v), v): BaseLiteralExpression(v) for v in (None, False, True, *range(256))
+}
 
 
 # ======================================================================================
@@ -412,6 +825,7 @@ RT = TypeVar("RT")
 
 
 class If:
+    __slots__ = ("_condition",)
     _condition: BaseExpression[bool]
 
     def __init__(
@@ -459,6 +873,7 @@ class If:
 
 
 class IncompleteConditional[RT]:
+    __slots__ = ("_condition", "_result_if_true", "previous_incomplete_conditional")
     _result_if_true: BaseExpression[RT]
     _condition: BaseExpression[bool]
     previous_incomplete_conditional: IncompleteConditional[RT] | None
@@ -491,6 +906,8 @@ class IncompleteConditional[RT]:
 
 
 class TwoThirdsTernary[RT](IncompleteConditional[RT]):
+    __slots__ = ()
+
     def and_(
         self,
         *unnamed_expressions: BaseExpression[bool],
@@ -513,6 +930,8 @@ class TwoThirdsTernary[RT](IncompleteConditional[RT]):
 
 
 class Then[RT](IncompleteConditional[RT]):
+    __slots__ = ()
+
     def elif_(
         self,
         *unnamed_expressions: BaseExpression[bool] | bool,
@@ -522,6 +941,7 @@ class Then[RT](IncompleteConditional[RT]):
 
 
 class Elif[RT](If):
+    __slots__ = ("_previous_incomplete_conditional",)
     _previous_incomplete_conditional: IncompleteConditional[RT]
 
     def __init__(
@@ -564,6 +984,7 @@ class Elif[RT](If):
 
 
 class Conditional[RT](BaseExpression[RT]):
+    __slots__ = ("_condition", "_result_if_false", "_result_if_true")
     _operator: ClassVar[str | None] = None
     _short_operator: ClassVar[str | None] = _operator
 
@@ -581,13 +1002,13 @@ class Conditional[RT](BaseExpression[RT]):
         self._result_if_true = _ensure_expression(result_if_true)
         self._condition = _ensure_expression(condition)
         self._result_if_false = _ensure_expression(result_if_false)
+        self._is_pure = all(map(_is_pure_of, self._evaluated_operands))
 
     @property
-    def operands(self) -> list[BaseExpression[bool]]:
+    def operands(self) -> tuple[BaseExpression[bool], ...]:
         return self.evaluated_expression.operands
 
-    @property
-    def value(self) -> RT:
+    def _compute_value(self) -> RT:
         return (
             self._result_if_true.value
             if self._condition.value
@@ -595,27 +1016,40 @@ class Conditional[RT](BaseExpression[RT]):
         )
 
     @property
-    def evaluated_expression(self) -> BaseExpression[bool]:
+    @override
+    def _evaluated_operands(self) -> tuple[BaseExpression[Any], ...]:
+        return (self._condition, self._result_if_true, self._result_if_false)
+
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._condition._emit(code, memo_slots)
+        jump_if_false_index = len(code)
+        code.append((_POP_JUMP_IF_FALSE, None))  # Target patched below.
+        self._result_if_true._emit(code, memo_slots)
+        jump_index = len(code)
+        code.append((_JUMP, None))  # Target patched below.
+        code[jump_if_false_index] = (_POP_JUMP_IF_FALSE, len(code))
+        self._result_if_false._emit(code, memo_slots)
+        code[jump_index] = (_JUMP, len(code))
+
+    def _compute_evaluated_expression(self) -> BaseExpression[bool]:
         return self._condition.evaluated_expression
 
-    @property
     @override
-    def evaluated_expression_record(self) -> EvaluatedExpressionRecord:
+    def _record_row(self) -> dict[str, Any]:
         raise Exception
 
-    @property
-    def reason(self) -> str:
-        return f"{self.value} because " + self.evaluated_expression.reason
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        parts.append(f"{self.value} because ")
+        parts.append(self.evaluated_expression.reason)
 
     @override
-    def __str__(self):
-        return (
-            (f"{self._name} := " if self._name else "")
-            + f"{self.value} because "
-            + self.evaluated_expression.reason
-        )
+    def _write_str_reason(self, parts: list[str]) -> None:
+        parts.append(self.evaluated_expression.reason)
 
     def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
         if isinstance(other, Conditional):
             other = cast(Conditional[RT], other)
             return (
@@ -629,6 +1063,7 @@ class Conditional[RT](BaseExpression[RT]):
 
 
 class Lookup[K, V](BaseExpression[V]):
+    __slots__ = ("_look_up_key", "_lookup_dict")
     _lookup_dict: dict[K, BaseExpression[V]]
     _look_up_key: BaseExpression[K]
 
@@ -637,40 +1072,64 @@ class Lookup[K, V](BaseExpression[V]):
         lookup_dict: dict[K, BaseExpression[V] | V],
         look_up_key: BaseExpression[K] | K,
     ) -> None:
+        super().__init__()
         self._lookup_dict = {k: _ensure_expression(v) for k, v in lookup_dict.items()}
         self._look_up_key = _ensure_expression(look_up_key)
+        self._is_pure = all(map(_is_pure_of, self.operands))
 
     @property
-    def operands(self) -> list[BaseExpression[bool]]:
+    def operands(self) -> tuple[BaseExpression[bool], ...]:
         return self.evaluated_expression.operands
 
-    @property
-    def value(self) -> V:
+    def _compute_value(self) -> V:
         return self._lookup_dict[self._look_up_key.value].value
 
     @property
-    def evaluated_expression(self) -> BaseExpression[K]:
+    @override
+    def _evaluated_operands(self) -> tuple[BaseExpression[Any], ...]:
+        return (self._look_up_key, *self._lookup_dict.values())
+
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_lookup(code, memo_slots, default=None)
+
+    def _emit_lookup(
+        self,
+        code: _Code,
+        memo_slots: dict[int, int],
+        default: BaseExpression[Any] | None,
+    ) -> None:
+        self._look_up_key._emit(code, memo_slots)
+        lookup_index = len(code)
+        code.append((_LOOKUP, None))  # Targets patched below.
+        targets: dict[K, int] = {}
+        jump_indices: list[int] = []
+        for k, v in self._lookup_dict.items():
+            targets[k] = len(code)
+            v._emit(code, memo_slots)
+            jump_indices.append(len(code))
+            code.append((_JUMP, None))  # Target patched below.
+        default_target = None
+        if default is not None:
+            default_target = len(code)
+            default._emit(code, memo_slots)
+        code[lookup_index] = (_LOOKUP, (targets, default_target))
+        for i in jump_indices:
+            code[i] = (_JUMP, len(code))
+
+    def _compute_evaluated_expression(self) -> BaseExpression[K]:
         return self._look_up_key.evaluated_expression
 
-    @property
     @override
-    def evaluated_expression_record(self) -> EvaluatedExpressionRecord:
+    def _record_row(self) -> dict[str, Any]:
         raise Exception
 
-    @property
-    def reason(self) -> str:
-        return self.evaluated_expression.reason
-
     @override
-    def __str__(self):
-        return (
-            (f"{self._name} := " if self._name else "")
-            + f"{self.value} because "
-            + self.evaluated_expression.reason
-        )
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        parts.append(self.evaluated_expression.reason)
 
 
 class UncertainLookup[K, V, D](Lookup[K, V]):
+    __slots__ = ("_default",)
     _default: BaseExpression[D]
 
     def __init__(
@@ -681,11 +1140,20 @@ class UncertainLookup[K, V, D](Lookup[K, V]):
     ) -> None:
         super().__init__(lookup_dict, look_up_key)
         self._default = _ensure_expression(default)
+        self._is_pure = self._is_pure and self._default._is_pure
 
-    @property
-    def value(self) -> V | D:
+    def _compute_value(self) -> V | D:
         return self._lookup_dict.get(self._look_up_key.value, self._default).value
 
+    @property
+    @override
+    def _evaluated_operands(self) -> tuple[BaseExpression[Any], ...]:
+        return (*super()._evaluated_operands, self._default)
+
+    @override
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_lookup(code, memo_slots, default=self._default)
+
 
 # ======================================================================================
 # Numeric expressions
@@ -695,6 +1163,8 @@ N = int | float
 
 
 class NumericBaseExpression(BaseExpression[N]):
+    __slots__ = ()
+
     def times(
         self,
         *unnamed_expressions: BaseExpression[N] | N,
@@ -777,19 +1247,20 @@ class NumericBaseExpression(BaseExpression[N]):
             lhs=self, rhs=_one_expression_from(unnamed_expressions, named_expressions)
         )
 
-    @property
-    def evaluated_expression(self) -> BaseExpression[N]:
+    def _compute_evaluated_expression(self) -> BaseExpression[N]:
         return self
 
 
 class NumericLiteralExpression(BaseLiteralExpression[N], NumericBaseExpression):
-    pass
+    __slots__ = ()
 
 
 class Product(NumericBaseExpression):
+    __slots__ = ("_operands",)
+    _is_internable: ClassVar[bool] = True
     _operator: ClassVar[str | None] = "times"
     _short_operator: ClassVar[str | None] = "*"
-    _operands: list[BaseExpression[N]]
+    _operands: tuple[BaseExpression[N], ...]
 
     def __init__(
         self,
@@ -797,43 +1268,50 @@ class Product(NumericBaseExpression):
         **named_expressions: BaseExpression[N] | N,
     ) -> None:
         super().__init__()
-        self._operands = []
-        for o in _expressions_from(unnamed_expressions, named_expressions):
-            if o._name is not None or not isinstance(o, Product):
-                self._operands.append(o)
-            else:
-                self._operands.extend(o._operands)
+        self._operands = _flattened(
+            Product, _expressions_from(unnamed_expressions, named_expressions)
+        )
+        self._is_pure = all(map(_is_pure_of, self._operands))
 
     @property
-    def operands(self) -> list[BaseExpression[N]]:
+    def operands(self) -> tuple[BaseExpression[N], ...]:
         return self._operands
 
-    @property
-    def value(self) -> N:
-        return math.prod(o.value for o in self._operands)
+    def _compute_value(self) -> N:
+        return math.prod(map(_value_of, self._operands))
 
-    @property
-    def reason(self) -> str:
-        reason_string = ""
-        if isinstance(self._operands[0], Inverse) or isinstance(
-            self._operands[0], Negative
-        ):
-            reason_string += f"{self._operands[0].reason}"
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, _prod, self._operands)
+
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        first_operand_type = type(self._operands[0])
+        if first_operand_type is Inverse or first_operand_type is Negative:
+            parts.append(self._operands[0])
         else:
-            reason_string += f"({self._operands[0].reason})"
+            parts.append("(")
+            parts.append(self._operands[0])
+            parts.append(")")
         for operand in self._operands[1:]:
-            if isinstance(operand, Inverse):
-                reason_string += (
-                    f" {Inverse._short_operator} ({operand._operand.reason})"  # type: ignore
-                )
-            elif isinstance(operand, Negative):
-                reason_string += f" {self._short_operator} {operand.reason}"
+            operand_type = type(operand)
+            if operand_type is Inverse:
+                parts.append(Inverse._separator)
+                parts.append("(")
+                parts.append(operand._operand)  # type: ignore
+                parts.append(")")
+            elif operand_type is Negative:
+                parts.append(self._separator)
+                parts.append(operand)
             else:
-                reason_string += f" {self._short_operator} ({operand.reason})"
-        return reason_string
+                parts.append(self._separator)
+                parts.append("(")
+                parts.append(operand)
+                parts.append(")")
 
 
 class Inverse(NumericBaseExpression):
+    __slots__ = ("_operand",)
+    _is_internable: ClassVar[bool] = True
     _operator: ClassVar[str | None] = "inverse"
     _short_operator: ClassVar[str | None] = "/"
     _operand: BaseExpression[N]
@@ -845,24 +1323,31 @@ class Inverse(NumericBaseExpression):
     ) -> None:
         super().__init__()
         self._operand = _one_expression_from(unnamed_expressions, named_expressions)
+        self._is_pure = self._operand._is_pure
 
     @property
-    def operands(self) -> list[BaseExpression[N]]:
-        return [self._operand]
+    def operands(self) -> tuple[BaseExpression[N], ...]:
+        return (self._operand,)
 
-    @property
-    def value(self) -> float:
+    def _compute_value(self) -> float:
         return 1 / self._operand.value
 
-    @property
-    def reason(self) -> str:
-        return f"1 {self._short_operator} ({self._operand.reason})"
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, _inverse, (self._operand,))
+
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        parts.append(f"1 {self._short_operator} (")
+        parts.append(self._operand)
+        parts.append(")")
 
 
 class Sum(NumericBaseExpression):
+    __slots__ = ("_operands",)
+    _is_internable: ClassVar[bool] = True
     _operator: ClassVar[str | None] = "plus"
     _short_operator: ClassVar[str | None] = "+"
-    _operands: list[BaseExpression[N]]
+    _operands: tuple[BaseExpression[N], ...]
 
     def __init__(
         self,
@@ -870,43 +1355,50 @@ class Sum(NumericBaseExpression):
         **named_expressions: BaseExpression[N] | N,
     ) -> None:
         super().__init__()
-        self._operands = []
-        for o in _expressions_from(unnamed_expressions, named_expressions):
-            if o._name is not None or not isinstance(o, Sum):
-                self._operands.append(o)
-            else:
-                self._operands.extend(o._operands)
+        self._operands = _flattened(
+            Sum, _expressions_from(unnamed_expressions, named_expressions)
+        )
+        self._is_pure = all(map(_is_pure_of, self._operands))
 
     @property
-    def operands(self) -> list[BaseExpression[N]]:
+    def operands(self) -> tuple[BaseExpression[N], ...]:
         return self._operands
 
-    @property
-    def value(self) -> N:
-        return sum(o.value for o in self._operands)
+    def _compute_value(self) -> N:
+        return sum(map(_value_of, self._operands))
 
-    @property
-    def reason(self) -> str:
-        reason_string = ""
-        if isinstance(self._operands[0], Negative) or isinstance(
-            self._operands[0], Inverse
-        ):
-            reason_string += self._operands[0].reason
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, _sum, self._operands)
+
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        first_operand_type = type(self._operands[0])
+        if first_operand_type is Negative or first_operand_type is Inverse:
+            parts.append(self._operands[0])
         else:
-            reason_string += f"({self._operands[0].reason})"
+            parts.append("(")
+            parts.append(self._operands[0])
+            parts.append(")")
         for operand in self._operands[1:]:
-            if isinstance(operand, Negative):
-                reason_string += (
-                    f" {Negative._short_operator} ({operand._operand.reason})"  # type: ignore
-                )
-            elif isinstance(operand, Inverse):
-                reason_string += f" {self._short_operator} {operand.reason}"
+            operand_type = type(operand)
+            if operand_type is Negative:
+                parts.append(Negative._separator)
+                parts.append("(")
+                parts.append(operand._operand)  # type: ignore
+                parts.append(")")
+            elif operand_type is Inverse:
+                parts.append(self._separator)
+                parts.append(operand)
             else:
-                reason_string += f" {self._short_operator} ({operand.reason})"
-        return reason_string
+                parts.append(self._separator)
+                parts.append("(")
+                parts.append(operand)
+                parts.append(")")
 
 
 class Negative(NumericBaseExpression):
+    __slots__ = ("_operand",)
+    _is_internable: ClassVar[bool] = True
     _operator: ClassVar[str | None] = "negative"
     _short_operator: ClassVar[str | None] = "-"
     _operand: BaseExpression[N]
@@ -918,112 +1410,123 @@ class Negative(NumericBaseExpression):
     ) -> None:
         super().__init__()
         self._operand = _one_expression_from(unnamed_expressions, named_expressions)
+        self._is_pure = self._operand._is_pure
 
     @property
-    def operands(self) -> list[BaseExpression[N]]:
-        return [self._operand]
+    def operands(self) -> tuple[BaseExpression[N], ...]:
+        return (self._operand,)
 
-    @property
-    def value(self) -> N:
+    def _compute_value(self) -> N:
         return -self._operand.value
 
-    @property
-    def reason(self) -> str:
-        return f"{self._short_operator}({self._operand.reason})"
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, _negative, (self._operand,))
+
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        parts.append(f"{self._short_operator}(")
+        parts.append(self._operand)
+        parts.append(")")
 
 
 class _NumericComparison(BooleanBaseExpression):
+    __slots__ = ("_lhs", "_rhs")
+    _is_internable: ClassVar[bool] = True
     _lhs: BaseExpression[N]
     _rhs: BaseExpression[N]
+    _compare: ClassVar[Callable[[Any, Any], bool]]
+    # The comparison that is true whenever this one is false. Set below, once all
+    # comparisons are defined:
+    _opposite: ClassVar[type[_NumericComparison]]
 
     def __init__(self, lhs: BaseExpression[N] | N, rhs: BaseExpression[N] | N) -> None:
         super().__init__()
         self._lhs = _ensure_expression(lhs)
         self._rhs = _ensure_expression(rhs)
+        self._is_pure = self._lhs._is_pure and self._rhs._is_pure
 
     @property
-    def operands(self) -> list[BaseExpression[N]]:
-        return [self._lhs, self._rhs]
+    def operands(self) -> tuple[BaseExpression[N], ...]:
+        return (self._lhs, self._rhs)
+
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, self._compare, self.operands)
+
+    def _compute_evaluated_expression(self) -> _NumericComparison:
+        return self if self.value else self._opposite(self._lhs, self._rhs)
+
+    @override
+    def _write_reason(self, parts: _ReasonParts) -> None:
+        separator = self._separator if self.value else self._opposite._separator
+        parts.extend(("(", self._lhs, ")", separator, "(", self._rhs, ")"))
 
 
 class EqualToComparison(_NumericComparison):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is equal to"
     _short_operator: ClassVar[str | None] = "=="
+    _compare: ClassVar[Callable[[Any, Any], bool]] = staticmethod(eq)
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._lhs.value == self._rhs.value
 
-    @property
-    def evaluated_expression(self) -> _NumericComparison:
-        return self if self.value else NotEqualToComparison(self._lhs, self._rhs)
-
 
 class NotEqualToComparison(_NumericComparison):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is not equal to"
     _short_operator: ClassVar[str | None] = "!="
+    _compare: ClassVar[Callable[[Any, Any], bool]] = staticmethod(ne)
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._lhs.value != self._rhs.value
 
-    @property
-    def evaluated_expression(self) -> _NumericComparison:
-        return self if self.value else EqualToComparison(self._lhs, self._rhs)
-
 
 class GreaterThanComparison(_NumericComparison):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is greater than"
     _short_operator: ClassVar[str | None] = ">"
+    _compare: ClassVar[Callable[[Any, Any], bool]] = staticmethod(gt)
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._lhs.value > self._rhs.value
 
-    @property
-    def evaluated_expression(self) -> _NumericComparison:
-        return self if self.value else LessThanOrEqualToComparison(self._lhs, self._rhs)
-
 
 class GreaterThanOrEqualToComparison(_NumericComparison):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is greater than or equal to"
     _short_operator: ClassVar[str | None] = ">="
+    _compare: ClassVar[Callable[[Any, Any], bool]] = staticmethod(ge)
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._lhs.value >= self._rhs.value
 
-    @property
-    def evaluated_expression(self) -> _NumericComparison:
-        return self if self.value else LessThanComparison(self._lhs, self._rhs)
-
 
 class LessThanComparison(_NumericComparison):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is less than"
     _short_operator: ClassVar[str | None] = "<"
+    _compare: ClassVar[Callable[[Any, Any], bool]] = staticmethod(lt)
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._lhs.value < self._rhs.value
 
-    @property
-    def evaluated_expression(self) -> _NumericComparison:
-        return (
-            self if self.value else GreaterThanOrEqualToComparison(self._lhs, self._rhs)
-        )
-
 
 class LessThanOrEqualToComparison(_NumericComparison):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is less than or equal to"
     _short_operator: ClassVar[str | None] = "<="
+    _compare: ClassVar[Callable[[Any, Any], bool]] = staticmethod(le)
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._lhs.value <= self._rhs.value
 
-    @property
-    def evaluated_expression(self) -> _NumericComparison:
-        return self if self.value else GreaterThanComparison(self._lhs, self._rhs)
+
+EqualToComparison._opposite = NotEqualToComparison
+NotEqualToComparison._opposite = EqualToComparison
+GreaterThanComparison._opposite = LessThanOrEqualToComparison
+GreaterThanOrEqualToComparison._opposite = LessThanComparison
+LessThanComparison._opposite = GreaterThanOrEqualToComparison
+LessThanOrEqualToComparison._opposite = GreaterThanComparison
 
 
 # ======================================================================================
@@ -1031,54 +1534,199 @@ class LessThanOrEqualToComparison(_NumericComparison):
 
 
 class NullExpression(BaseLiteralExpression[Any | None]):
-    _id = UUID(int=0)
-    _name = None
-    _literal_value = None
+    __slots__ = ()
 
     @override
     def __init__(self) -> None:
-        pass
+        super().__init__(None)
+        self._lazy_id = UUID(int=0)
 
 
 Null = NullExpression()
 
 
 class IsOrIsNotNullExpression[T](BooleanBaseExpression):
+    __slots__ = ("_val",)
+    _is_internable: ClassVar[bool] = True
     _val: BaseExpression[T]
 
     def __init__(self, val: BaseExpression[T]) -> None:
         super().__init__()
         self._val = val
+        self._is_pure = val._is_pure
+
+    @property
+    def operands(self) -> tuple[BaseExpression[T] | NullExpression, ...]:
+        return (self._val, Null)
 
     @property
-    def operands(self) -> list[BaseExpression[T] | NullExpression]:
-        return [self._val, Null]
+    @override
+    def _evaluated_operands(self) -> tuple[BaseExpression[Any], ...]:
+        return (self._val,)
 
 
 class IsNullExpression[T](IsOrIsNotNullExpression[T]):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is"
     _short_operator: ClassVar[str | None] = _operator
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._val.value is None
 
-    @property
-    def evaluated_expression(self) -> BooleanBaseExpression:
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, _is_none, (self._val,))
+
+    def _compute_evaluated_expression(self) -> BooleanBaseExpression:
         return self if self.value else IsNotNullExpression(self._val)
 
 
 class IsNotNullExpression[T](IsOrIsNotNullExpression[T]):
+    __slots__ = ()
     _operator: ClassVar[str | None] = "is not"
     _short_operator: ClassVar[str | None] = _operator
 
-    @property
-    def value(self) -> bool:
+    def _compute_value(self) -> bool:
         return self._val.value is not None
 
-    @property
-    def evaluated_expression(self) -> BooleanBaseExpression:
+    def _emit_evaluation(self, code: _Code, memo_slots: dict[int, int]) -> None:
+        self._emit_application(code, memo_slots, _is_not_none, (self._val,))
+
+    def _compute_evaluated_expression(self) -> BooleanBaseExpression:
         return self if self.value else IsNullExpression(self._val)
 
 
 # ======================================================================================
+# Compiled evaluation
+
+# Opcodes of the linear programs that expressions compile to. Each instruction is an
+# `(opcode, argument)` pair:
+_CONST = 0  # Push the argument.
+_CALL = 1  # Push the value returned by the argument, running it if an expression.
+_APPLY = 2  # Replace the top `n` values with `function(*values)`.
+_JUMP = 3  # Continue at the argument.
+_JUMP_IF_FALSE = 4  # Continue at the argument if the top value is falsy, else pop it.
+_JUMP_IF_TRUE = 5  # Continue at the argument if the top value is truthy, else pop it.
+_POP_JUMP_IF_FALSE = 6  # Pop the top value and continue at the argument if falsy.
+_LOOKUP = 7  # Pop a key and continue at its target, else at the default target.
+_LOAD_OR_JUMP = 8  # If already memoized, push the memoized value and skip ahead.
+_STORE = 9  # Memoize the top value.
+_INPUT = 10  # If the named literal is given as an input, push its value and skip ahead.
+
+type _Code = list[tuple[int, Any]]
+type _Program = tuple[tuple[tuple[int, Any], ...], int]
+
+
+def _not(value: Any) -> bool:
+    return not value
+
+
+def _prod(*values: N) -> N:
+    return math.prod(values)
+
+
+def _sum(*values: N) -> N:
+    return sum(values)
+
+
+def _inverse(value: N) -> float:
+    return 1 / value
+
+
+def _negative(value: N) -> N:
+    return -value
+
+
+def _is_none(value: Any) -> bool:
+    return value is None
+
+
+def _is_not_none(value: Any) -> bool:
+    return value is not None
+
+
+def _not_none[V](value: V | None) -> V:
+    if value is None:
+        raise ValueError
+    return value
+
+
+def _emit_short_circuit(
+    code: _Code,
+    memo_slots: dict[int, int],
+    jump_opcode: int,
+    operands: tuple[BaseExpression[bool], ...],
+) -> None:
+    jump_indices: list[int] = []
+    for o in operands[:-1]:
+        o._emit(code, memo_slots)
+        jump_indices.append(len(code))
+        code.append((jump_opcode, None))  # Target patched below.
+    operands[-1]._emit(code, memo_slots)
+    for i in jump_indices:
+        code[i] = (jump_opcode, len(code))
+    code.append((_APPLY, (bool, 1)))
+
+
+def _run(
+    code: tuple[tuple[int, Any], ...], memo_size: int, inputs: dict[str, Any]
+) -> Any:
+    stack: list[Any] = []
+    memo: list[Any] = [_MISSING] * memo_size
+    i = 0
+    end = len(code)
+    while i < end:
+        opcode, argument = code[i]
+        i += 1
+        if opcode == _CONST:
+            stack.append(argument)
+        elif opcode == _INPUT:
+            name, target = argument
+            if name in inputs:
+                stack.append(inputs[name])
+                i = target
+        elif opcode == _APPLY:
+            function, n = argument
+            if n == 1:
+                stack[-1] = function(stack[-1])
+            else:
+                values = stack[-n:]
+                del stack[-n:]
+                stack.append(function(*values))
+        elif opcode == _JUMP_IF_FALSE:
+            if stack[-1]:
+                stack.pop()
+            else:
+                i = argument
+        elif opcode == _JUMP_IF_TRUE:
+            if stack[-1]:
+                i = argument
+            else:
+                stack.pop()
+        elif opcode == _POP_JUMP_IF_FALSE:
+            if not stack.pop():
+                i = argument
+        elif opcode == _JUMP:
+            i = argument
+        elif opcode == _CALL:
+            value = argument()
+            if type(value) not in _PRIMITIVE_TYPES and isinstance(
+                value, BaseExpression
+            ):
+                value = _run(*value._program, inputs)
+            stack.append(value)
+        elif opcode == _LOOKUP:
+            targets, default_target = argument
+            key = stack.pop()
+            i = (
+                targets[key]
+                if default_target is None
+                else targets.get(key, default_target)
+            )
+        elif opcode == _LOAD_OR_JUMP:
+            memo_slot, target = argument
+            if memo[memo_slot] is not _MISSING:
+                stack.append(memo[memo_slot])
+                i = target
+        else:  # _STORE
+            memo[argument] = stack[-1]
+    return stack.pop()
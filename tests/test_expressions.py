@@ -22,6 +22,7 @@ from expressions import (
     Inverse,
     LessThanComparison,
     LessThanOrEqualToComparison,
+    Lookup,
     Negative,
     Not,
     NotEqualToComparison,
@@ -38,7 +39,7 @@ from schema import (
     EvaluatedExpressionRecord,
     define_metadata_table,
 )
-from utils import get_exactly_one
+from utils import get_exactly_one, uuid7s
 
 
 class TestBooleanExpression:
@@ -73,6 +74,13 @@ class TestNotExpression:
         assert str(y) == "True because x := False"
         assert str(y.with_name("y")) == "y := True because x := False"
 
+    def test_naming_shares_operands(self) -> None:
+        y = Not(x=True)
+        named_y = y.with_name("y")
+        assert named_y.operands[0] is y.operands[0]
+        assert named_y._id != y._id  # type: ignore
+        assert y._name is None  # type: ignore
+
 
 class TestAndExpression:
     def test_when_true(self) -> None:
@@ -97,6 +105,23 @@ class TestAndExpression:
             b=And(b1=True, b2=True),
         ) != And(a1=True, a2=True, b1=True, b2=True)
 
+    def test_evaluating_operands_in_order(self) -> None:
+        val = UncertainLookup({"a": 1, "b": 2}, "z")
+        is_positive = GreaterThanComparison(Numeric(val), 0)
+        assert And(val.is_not_null, is_positive).value is False
+        assert val.is_not_null.and_(is_positive).value is False
+
+        k = BaseLiteralExpression[str](k="z")
+        is_known = Or(EqualToComparison(k, "a"), EqualToComparison(k, "b"))
+        is_positive = GreaterThanComparison(Numeric(Lookup({"a": 1, "b": 2}, k)), 0)
+        assert And(is_known, is_positive).value is False
+        assert And(is_known, is_positive).compile()() is False
+
+        y = Nullable[int](y=None)
+        guard = Or(Bool(flag=False), y.is_not_null)
+        assert And(guard, Numeric.from_(y).gt(0)).value is False
+        assert guard.and_(Numeric.from_(y).gt(0)).value is False
+
 
 class TestOrExpression:
     def test_when_true(self) -> None:
@@ -449,6 +474,150 @@ class TestNullable:
         assert str(c) == "6 because (2 because (x := 1) is not (None)) is not (None)"
 
 
+def test_evaluating_shared_subexpressions_once() -> None:
+    evaluations: list[None] = []
+
+    def x() -> bool:
+        evaluations.append(None)
+        return False
+
+    shared = Not(Bool(x=x))
+    y = Or(And(shared, a=True), And(shared, b=True), And(shared, c=False))
+    assert y.value is True
+    assert str(y) == (
+        "True because ((x := False) and (a := True)) or ((x := False) and (b := True))"
+    )
+    assert len(evaluations) == 1
+
+
+def test_sharing_structurally_identical_subexpressions() -> None:
+    x = Bool(x=True)
+    y = Or(And(Not(x), a=True), And(Not(x), a=True).with_name("b"))
+    not_x, a = y.operands[0].operands
+    assert y.operands[1].operands == (not_x, a)
+    assert y.operands[1].operands[0] is not_x
+    assert Or(Not(x), Not(x).with_name("n")).operands[0] is not_x
+    z = Numeric(z=2)
+    assert And(z.gt(1), z.gt(1)).operands[0] is z.gt(1).and_(z.gt(1)).operands[1]
+    assert Sum(z.times(3), z.times(3)).operands[0] is Sum(3, z.times(3)).operands[1]
+    c = Bool(c=lambda: True)
+    not_c_1, not_c_2 = Or(Not(c), Not(c)).operands
+    assert not_c_1 is not not_c_2
+
+
+def test_sharing_common_literals() -> None:
+    y = Sum(1, True, 1.0)
+    assert y.operands[0] is Product(1, 2).operands[0]
+    assert y.operands[1] is not y.operands[0]
+    assert [type(o.value) for o in y.operands] == [int, bool, float]
+    one = y.operands[0]
+    one_id = one._id  # type: ignore
+    Sum(Numeric(lambda: 2), 1).invalidate()
+    assert one._id == one_id  # type: ignore
+
+
+def test_generating_time_ordered_ids() -> None:
+    ids = uuid7s(3)
+    assert [i.version for i in ids] == [7, 7, 7]
+    assert len(set(ids)) == 3
+    # Ordered by their leading millisecond timestamps:
+    assert uuid7s(1)[0].bytes[:6] >= ids[0].bytes[:6]
+
+
+def test_invalidating_cached_results() -> None:
+    inputs = dict(x=True)
+    y = Not(Bool(x=lambda: inputs["x"])).with_name("y")
+    assert str(y) == "y := False because x := True"
+    inputs["x"] = False
+    assert str(y) == "y := False because x := True"
+    y.invalidate()
+    assert str(y) == "y := True because x := False"
+
+
+def test_invalidating_only_results_that_can_change() -> None:
+    x = Numeric(x=1)
+    a = Sum(x, 1).with_name("a")
+    ids = [a._id, *(o._id for o in a.operands)]  # type: ignore
+    Product(x, 1).with_name("b").invalidate()
+    assert [a._id, *(o._id for o in a.operands)] == ids  # type: ignore
+
+
+def test_invalidating_cached_results_of_nullables() -> None:
+    inputs: dict[str, int | None] = dict(x=None)
+    x = Nullable[int](x=lambda: inputs["x"])
+    y = Numeric.from_(x).times(2).if_(x.is_not_null).else_(0)
+    assert y.value == 0
+    inputs["x"] = 5
+    y.invalidate()
+    assert y.value == 10
+
+
+class TestCompile:
+    def test_compiling_expression(self) -> None:
+        a = Nullable[int](x=None)
+        b = Numeric.from_(a).times(2).if_(a.is_not_null).else_(Numeric(3).plus(4))
+        y = Or(Not(GreaterThanComparison(b, 5)), Lookup({7: Bool(True)}, b))
+        assert y.compile()() is y.value is True
+
+    def test_reevaluating_callable_literals(self) -> None:
+        values = iter([1, 2])
+        x = Numeric(x=lambda: next(values))
+        evaluate = Sum(x, x).compile()
+        assert evaluate() == 2
+        assert evaluate() == 4
+
+    def test_reevaluating_returned_expressions(self) -> None:
+        values = iter([1, 2])
+        inner = Numeric(i=lambda: next(values))
+        evaluate = Numeric(lambda: inner).plus(0).compile()
+        assert evaluate() == 1
+        assert evaluate() == 2
+        assert evaluate(i=5) == 5
+
+    def test_overriding_named_literals(self) -> None:
+        y = Numeric(a=1).times(b=2).gt(c=5)
+        evaluate = y.compile()
+        assert evaluate() is False
+        assert evaluate(a=3) is True
+        assert evaluate(a=3, c=6) is False
+        with pytest.raises(KeyError):
+            evaluate(d=3)
+
+    def test_overriding_renamed_literals(self) -> None:
+        a = Numeric(a=1)
+        a.compile()
+        evaluate = a.with_name("b").compile()
+        assert evaluate(b=7) == 7
+        with pytest.raises(KeyError):
+            evaluate(a=7)
+
+    def test_overriding_nullables_of_not_null_literals(self) -> None:
+        x = Nullable[int](x=None)
+        evaluate = Numeric.from_(x).times(2).if_(x.is_not_null).else_(0).compile()
+        assert evaluate() == 0
+        assert evaluate(x=5) == 10
+        with pytest.raises(ValueError):
+            Numeric.from_(x).compile()()
+
+
+class TestEvaluatedExpressionRecord:
+    def test_sharing_records_of_shared_subexpressions(self) -> None:
+        x = Bool(x=True)
+        record = Or(Not(x), Not(x).with_name("n")).with_name("y")
+        record = record.evaluated_expression_record
+        not_record_1, not_record_2 = record.children
+        assert not_record_1 is not not_record_2
+        assert get_exactly_one(not_record_1.children) is get_exactly_one(
+            not_record_2.children
+        )
+
+    def test_deep_expression(self) -> None:
+        y = Bool(x=True)
+        for _ in range(5_000):
+            y = Not(y)
+        assert y.evaluated_expression_record.value is True
+
+
 class TestToDb:
     def test_inserting_expression_into_db(self, db_engine: sqla.Engine) -> None:
         md_table = define_metadata_table(Base.metadata, cols=[])
@@ -534,6 +703,30 @@ class TestToDb:
         Base.metadata.remove(md_table)
         Base.metadata.drop_all(db_engine, tables=[md_table])
 
+    def test_inserting_invalidated_expression_again(
+        self, db_engine: sqla.Engine
+    ) -> None:
+        md_table = define_metadata_table(Base.metadata, cols=[])
+        Base.metadata.create_all(db_engine)
+
+        inputs = dict(x=True)
+        y = Not(Bool(x=lambda: inputs["x"])).with_name("y")
+        y.to_db(db_engine, metadata=dict())
+        inputs["x"] = False
+        y.invalidate()
+        y.to_db(db_engine, metadata=dict())
+        with Session(db_engine) as session:
+            records = session.scalars(sqla.select(EvaluatedExpressionRecord)).all()
+            assert [(r.name, r.value) for r in records] == [
+                ("y", False),
+                ("x", True),
+                ("y", True),
+                ("x", False),
+            ]
+
+        Base.metadata.remove(md_table)
+        Base.metadata.drop_all(db_engine, tables=[md_table])
+
     def test_raising_if_root_expression_is_unnamed(
         self, db_engine: sqla.Engine
     ) -> None: